@@ -43,6 +43,8 @@ export default function CheckoutPage() {
   const [paymentStep, setPaymentStep] = useState(1)
   const [isProcessing, setIsProcessing] = useState(false)
   const [formErrors, setFormErrors] = useState<Record<string, string>>({})
+  // One key per checkout so a resubmit after a timeout can't create a second order
+  const [orderIdempotencyKey] = useState(() => crypto.randomUUID())
 
   // Get buy now parameters
   const productId = searchParams.get('product')
@@ -223,7 +225,7 @@ export default function CheckoutPage() {
             product_id: parseInt(productId),
             quantity: 1
           }]
-        })
+        }, orderIdempotencyKey)
       } else {
         // Handle cart checkout
         await api.createOrder({
@@ -232,7 +234,7 @@ export default function CheckoutPage() {
             product_id: item.product_id,
             quantity: item.quantity
           }))
-        })
+        }, orderIdempotencyKey)
       }
       router.push("/checkout/confirmation")
     } catch (error: any) {
@@ -0,0 +1,209 @@
+import calendar
+import os
+import threading
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed when the read model is enabled
+    np = None
+
+# Product listings come from SQL unless the columnar read model is switched on
+CATALOG_READ_MODEL = os.getenv("CATALOG_READ_MODEL", "0") == "1"
+SORT_OPTIONS = ("price_asc", "price_desc", "newest")
+
+INITIAL_CAPACITY = 1024
+
+
+def _timestamp(value) -> int:
+    """Microseconds since the epoch for a naive UTC datetime (as stored by the models)."""
+    if not value:
+        return 0
+    return calendar.timegm(value.utctimetuple()) * 1_000_000 + value.microsecond
+
+
+def _category_key(value: Optional[str]) -> Optional[str]:
+    # Categories match case-insensitively; the SQL path compares lower(category)
+    return value.lower() if value is not None else None
+
+
+class CatalogReadModel:
+    """Columnar in-memory copy of the product catalog for filter/sort queries.
+
+    Only the columns listings filter and sort on are kept, as NumPy arrays
+    (category and seller_id dictionary-encoded). Queries return product ids
+    in page order; the rows themselves are then loaded by primary key.
+    """
+
+    def __init__(self, enabled: bool = CATALOG_READ_MODEL):
+        if enabled and np is None:
+            raise RuntimeError("CATALOG_READ_MODEL is enabled but numpy is not installed")
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._size = 0
+        self._row_of: Dict[int, int] = {}
+        self._category_codes: Dict[str, int] = {}
+        self._seller_codes: Dict[int, int] = {}
+        if self.enabled:
+            self._allocate(INITIAL_CAPACITY)
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def _allocate(self, capacity: int):
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.stock = np.zeros(capacity, dtype=np.int32)
+        self.created_at = np.zeros(capacity, dtype=np.int64)
+        self.category = np.zeros(capacity, dtype=np.int32)
+        self.seller = np.zeros(capacity, dtype=np.int32)
+
+    def _grow(self):
+        columns = ("ids", "price", "stock", "created_at", "category", "seller")
+        old = {name: getattr(self, name) for name in columns}
+        self._allocate(len(self.ids) * 2)
+        for name in columns:
+            getattr(self, name)[:self._size] = old[name][:self._size]
+
+    @staticmethod
+    def _encode(codes: Dict, value) -> int:
+        if value not in codes:
+            codes[value] = len(codes)
+        return codes[value]
+
+    def _write_row(self, row: int, product: models.Product):
+        self.ids[row] = product.id
+        self.price[row] = product.price or 0.0
+        self.stock[row] = product.stock or 0
+        self.created_at[row] = _timestamp(product.created_at)
+        self.category[row] = self._encode(self._category_codes, _category_key(product.category))
+        self.seller[row] = self._encode(self._seller_codes, product.seller_id)
+
+    def _upsert(self, product: models.Product):
+        row = self._row_of.get(product.id)
+        if row is None:
+            if self._size == len(self.ids):
+                self._grow()
+            row = self._size
+            self._row_of[product.id] = row
+            self._size += 1
+        self._write_row(row, product)
+
+    def build(self, db: Session):
+        if not self.enabled:
+            return
+        products = db.query(models.Product).order_by(models.Product.id).all()
+        with self._lock:
+            self._size = 0
+            self._row_of = {}
+            self._category_codes = {}
+            self._seller_codes = {}
+            self._allocate(max(INITIAL_CAPACITY, len(products)))
+            for product in products:
+                self._upsert(product)
+
+    def upsert(self, product: models.Product):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._upsert(product)
+
+    def query(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        category: Optional[str] = None,
+        seller_id: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: bool = False,
+        sort: Optional[str] = None,
+    ) -> List[int]:
+        with self._lock:
+            size = self._size
+            mask = np.ones(size, dtype=bool)
+            if category is not None:
+                category = _category_key(category)
+                if category not in self._category_codes:
+                    return []
+                mask &= self.category[:size] == self._category_codes[category]
+            if seller_id is not None:
+                if seller_id not in self._seller_codes:
+                    return []
+                mask &= self.seller[:size] == self._seller_codes[seller_id]
+            if min_price is not None:
+                mask &= self.price[:size] >= min_price
+            if max_price is not None:
+                mask &= self.price[:size] <= max_price
+            if in_stock:
+                mask &= self.stock[:size] > 0
+
+            rows = np.flatnonzero(mask)
+            ids = self.ids[rows]
+            # Ties are broken by id to match the ORDER BY used on the SQL path
+            if sort == "price_asc":
+                order = np.lexsort((ids, self.price[rows]))
+            elif sort == "price_desc":
+                order = np.lexsort((ids, -self.price[rows]))
+            elif sort == "newest":
+                order = np.lexsort((ids, -self.created_at[rows]))
+            else:
+                order = np.argsort(ids, kind="stable")
+            # Same paging semantics as SQLite's LIMIT/OFFSET: a negative offset
+            # counts as 0 and a negative limit means no limit
+            skip = max(skip, 0)
+            end = None if limit < 0 else skip + limit
+            return ids[order][skip:end].tolist()
+
+
+def query_products_sql(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    category: Optional[str] = None,
+    seller_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: bool = False,
+    sort: Optional[str] = None,
+) -> List[models.Product]:
+    query = db.query(models.Product)
+    if category is not None:
+        # Served by the ix_products_category_lower expression index
+        query = query.filter(func.lower(models.Product.category) == _category_key(category))
+    if seller_id is not None:
+        query = query.filter(models.Product.seller_id == seller_id)
+    if min_price is not None:
+        query = query.filter(models.Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(models.Product.price <= max_price)
+    if in_stock:
+        query = query.filter(models.Product.stock > 0)
+
+    if sort == "price_asc":
+        query = query.order_by(models.Product.price.asc(), models.Product.id)
+    elif sort == "price_desc":
+        query = query.order_by(models.Product.price.desc(), models.Product.id)
+    elif sort == "newest":
+        query = query.order_by(models.Product.created_at.desc(), models.Product.id)
+    else:
+        query = query.order_by(models.Product.id)
+    return query.offset(skip).limit(limit).all()
+
+
+def load_products(db: Session, product_ids: List[int]) -> List[models.Product]:
+    """Load products by primary key, preserving the order of ``product_ids``."""
+    if not product_ids:
+        return []
+    products = db.query(models.Product).filter(models.Product.id.in_(product_ids)).all()
+    by_id = {product.id: product for product in products}
+    return [by_id[product_id] for product_id in product_ids if product_id in by_id]
+
+
+catalog_model = CatalogReadModel()
@@ -1,11 +1,17 @@
+import os
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./hanythrift.db"
+# Overridable so tests can point the app at a throwaway database
+SQLALCHEMY_DATABASE_URL = os.getenv("HANYTHRIFT_DATABASE_URL", "sqlite:///./hanythrift.db")
+
+# check_same_thread is a SQLite-only connect argument
+connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args=connect_args
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
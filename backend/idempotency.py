@@ -0,0 +1,166 @@
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+
+# How long a stored response can be replayed for
+IDEMPOTENCY_TTL_HOURS = 24
+# An unfinished claim (e.g. from a crashed worker) blocks its key for this long
+IN_FLIGHT_TTL_MINUTES = 10
+# Longer Idempotency-Key headers are rejected with 422
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+def _request_hash(payload: BaseModel) -> str:
+    body = json.dumps(payload.model_dump(mode="json"), sort_keys=True)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _find(db: Session, key: str, user_id: int, endpoint: str) -> Optional[models.IdempotencyKey]:
+    return (
+        db.query(models.IdempotencyKey)
+        .filter(
+            models.IdempotencyKey.user_id == user_id,
+            models.IdempotencyKey.endpoint == endpoint,
+            models.IdempotencyKey.key == key,
+        )
+        .first()
+    )
+
+
+def _find_claim(db: Session, key: str, user_id: int, endpoint: str, claim_token: str):
+    """The key's row, but only while it still belongs to this request's claim."""
+    record = _find(db, key, user_id, endpoint)
+    if record is None or record.claim_token != claim_token:
+        return None
+    return record
+
+
+def _claim(db: Session, key: str, user_id: int, endpoint: str, request_hash: str) -> Optional[str]:
+    """Insert an in-flight row for the key. Returns its claim token, or None if the key is taken."""
+    now = datetime.utcnow()
+    db.query(models.IdempotencyKey).filter(models.IdempotencyKey.expires_at < now).delete()
+    claim_token = uuid.uuid4().hex
+    db.add(models.IdempotencyKey(
+        key=key,
+        user_id=user_id,
+        endpoint=endpoint,
+        request_hash=request_hash,
+        claim_token=claim_token,
+        created_at=now,
+        expires_at=now + timedelta(minutes=IN_FLIGHT_TTL_MINUTES),
+    ))
+    try:
+        db.commit()
+        return claim_token
+    except IntegrityError:
+        db.rollback()
+        return None
+
+
+def _replay(record: models.IdempotencyKey):
+    body = json.loads(record.response_body)
+    if record.status_code >= 400:
+        raise HTTPException(status_code=record.status_code, detail=body["detail"])
+    return body
+
+
+def _existing_response(db: Session, key: str, user_id: int, endpoint: str, request_hash: str):
+    """Answer a request whose key is already claimed.
+
+    Returns the stored body, or None if the key was released meanwhile and the
+    caller should try to claim it. A duplicate of a request that is still
+    running gets an immediate 409 rather than waiting for it, so duplicates
+    can't pile up in the threadpool; the client retries later with the same key.
+    """
+    record = _find(db, key, user_id, endpoint)
+    if record is None:
+        return None
+    if record.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request",
+        )
+    if record.status_code is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still in progress",
+        )
+    return _replay(record)
+
+
+def _store(db: Session, record: Optional[models.IdempotencyKey], status_code: int, body: dict):
+    if record is None:
+        # The claim expired and was taken over; don't write onto another request's row
+        return
+    record.status_code = status_code
+    record.response_body = json.dumps(body)
+    record.expires_at = datetime.utcnow() + timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+    db.commit()
+
+
+def run_idempotent(
+    db: Session,
+    key: Optional[str],
+    user_id: int,
+    endpoint: str,
+    payload: BaseModel,
+    response_model: Type[BaseModel],
+    handler: Callable,
+):
+    """Run ``handler`` at most once per (user, endpoint, Idempotency-Key).
+
+    The first response is stored and replayed for later requests with the same
+    key. Duplicates that arrive while the first is still running get a 409
+    instead of running the handler again. A failed request releases the
+    key only if the handler committed nothing; otherwise the failure itself is
+    stored and replayed, so a retry can't repeat the writes that did happen.
+    """
+    if not key:
+        return handler()
+
+    request_hash = _request_hash(payload)
+    while True:
+        claim_token = _claim(db, key, user_id, endpoint, request_hash)
+        if claim_token is not None:
+            break
+        stored = _existing_response(db, key, user_id, endpoint, request_hash)
+        if stored is not None:
+            return stored
+
+    commits = []
+
+    def count_commit(session):
+        commits.append(session)
+
+    event.listen(db, "after_commit", count_commit)
+    try:
+        result = handler()
+    except Exception as exc:
+        event.remove(db, "after_commit", count_commit)
+        db.rollback()
+        record = _find_claim(db, key, user_id, endpoint, claim_token)
+        if not commits:
+            # Nothing was written, so the client can safely retry with the same key
+            if record is not None:
+                db.delete(record)
+                db.commit()
+        elif isinstance(exc, HTTPException):
+            _store(db, record, exc.status_code, {"detail": exc.detail})
+        else:
+            _store(db, record, status.HTTP_500_INTERNAL_SERVER_ERROR, {"detail": "Internal Server Error"})
+        raise
+    event.remove(db, "after_commit", count_commit)
+
+    body = response_model.model_validate(result).model_dump(mode="json")
+    _store(db, _find_claim(db, key, user_id, endpoint, claim_token), status.HTTP_200_OK, body)
+    return body
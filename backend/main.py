@@ -1,18 +1,26 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session, joinedload
 from datetime import timedelta
-from typing import List
+from typing import List, Optional
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import jwt, JWTError
 
 import models
 import schemas
 import auth
+from search_index import product_index, TOP_K
+from migrations import ensure_columns, ensure_indexes
+from idempotency import run_idempotent, IDEMPOTENCY_KEY_MAX_LENGTH
+from catalog import catalog_model, query_products_sql, load_products, SORT_OPTIONS
+from profiling import ProfiledRoute, request_profiler, require_profiler_token, PSTATS_SORT_KEYS
 from database import engine, get_db
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
+ensure_columns(engine)
+ensure_indexes(engine)
 
 # Add sample products if none exist
 def create_sample_products(db: Session = next(get_db())):
@@ -200,7 +208,14 @@ def create_sample_products(db: Session = next(get_db())):
 
 create_sample_products()
 
+# Build the in-memory prefix index used by search suggestions
+product_index.build(next(get_db()))
+# Build the columnar catalog used for product listings (no-op without numpy)
+catalog_model.build(next(get_db()))
+
 app = FastAPI(title="HanyThrift API")
+# Lets admins profile individual requests (see profiling.py); must be set before routes are added
+app.router.route_class = ProfiledRoute
 
 # Configure CORS
 app.add_middleware(
@@ -216,6 +231,24 @@ app.add_middleware(
 def health_check():
     return {"status": "ok"}
 
+# Profiling routes (require the X-Profiler-Token header)
+@app.get("/admin/profiles", dependencies=[Depends(require_profiler_token)])
+def read_profiles():
+    return request_profiler.summary()
+
+@app.get("/admin/profiles/pstats", response_class=PlainTextResponse, dependencies=[Depends(require_profiler_token)])
+def read_profiles_pstats(sort: str = "tottime"):
+    if sort not in PSTATS_SORT_KEYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort. Use one of: {', '.join(PSTATS_SORT_KEYS)}"
+        )
+    return request_profiler.pstats_text(sort)
+
+@app.get("/admin/profiles/collapsed", response_class=PlainTextResponse, dependencies=[Depends(require_profiler_token)])
+def read_profiles_collapsed():
+    return request_profiler.collapsed_stacks()
+
 # Authentication routes
 @app.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
@@ -323,9 +356,35 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
 # Product routes
 @app.get("/products/", response_model=List[schemas.Product])
-def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    products = db.query(models.Product).offset(skip).limit(limit).all()
-    return products
+def read_products(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0),
+    db: Session = Depends(get_db),
+    category: Optional[str] = None,
+    seller_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: bool = False,
+    sort: Optional[str] = None
+):
+    if sort is not None and sort not in SORT_OPTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort. Use one of: {', '.join(SORT_OPTIONS)}"
+        )
+    filters = dict(
+        category=category, seller_id=seller_id, min_price=min_price,
+        max_price=max_price, in_stock=in_stock, sort=sort
+    )
+    if catalog_model.enabled:
+        # Filter and sort in memory, then load just the page by primary key
+        return load_products(db, catalog_model.query(skip, limit, **filters))
+    return query_products_sql(db, skip, limit, **filters)
+
+# Declared before /products/{product_id} so "suggest" isn't parsed as an id
+@app.get("/products/suggest", response_model=List[schemas.ProductSuggestion])
+def suggest_products(prefix: str = "", limit: int = 10):
+    return product_index.suggest(prefix, limit=max(1, min(limit, TOP_K)))
 
 @app.get("/products/{product_id}", response_model=schemas.Product)
 def read_product(product_id: int, db: Session = Depends(get_db)):
@@ -355,6 +414,8 @@ def create_product(
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    product_index.add_product(db_product)
+    catalog_model.upsert(db_product)
     return db_product
 
 # Cart routes
@@ -375,8 +436,15 @@ def read_cart(
 def add_to_cart(
     cart_item: schemas.CartItemCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: models.User = Depends(auth.get_current_active_user),
+    idempotency_key: Optional[str] = Header(None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
 ):
+    return run_idempotent(
+        db, idempotency_key, current_user.id, "POST /cart/", cart_item, schemas.CartItem,
+        lambda: _add_to_cart(cart_item, db, current_user)
+    )
+
+def _add_to_cart(cart_item: schemas.CartItemCreate, db: Session, current_user: models.User):
     # Check if product exists
     product = db.query(models.Product).filter(models.Product.id == cart_item.product_id).first()
     if not product:
@@ -471,8 +539,28 @@ def read_orders(
 def create_order(
     order: schemas.OrderCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: models.User = Depends(auth.get_current_active_user),
+    idempotency_key: Optional[str] = Header(None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
 ):
+    return run_idempotent(
+        db, idempotency_key, current_user.id, "POST /orders/", order, schemas.Order,
+        lambda: _create_order(order, db, current_user)
+    )
+
+def _create_order(order: schemas.OrderCreate, db: Session, current_user: models.User):
+    # Look up every product first so a bad item can't leave a partial order behind
+    product_ids = {item.product_id for item in order.items}
+    products = {
+        product.id: product
+        for product in db.query(models.Product).filter(models.Product.id.in_(product_ids)).all()
+    }
+    missing = product_ids - products.keys()
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Products not found: {', '.join(str(product_id) for product_id in sorted(missing))}"
+        )
+
     # Create order
     db_order = models.Order(
         user_id=current_user.id,
@@ -480,8 +568,7 @@ def create_order(
         status="pending"
     )
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    db.flush()
 
     # Create order items
     for item in order.items:
@@ -489,9 +576,16 @@ def create_order(
             order_id=db_order.id,
             product_id=item.product_id,
             quantity=item.quantity,
-            price_at_time=db.query(models.Product).filter(models.Product.id == item.product_id).first().price
+            price_at_time=products[item.product_id].price
         )
         db.add(db_order_item)
     
     db.commit()
-    return db_order 
\ No newline at end of file
+    db.refresh(db_order)
+
+    # Ordered units rank products higher in search suggestions
+    quantities = {}
+    for item in order.items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    product_index.record_order(quantities)
+    return db_order
@@ -0,0 +1,37 @@
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateIndex
+
+import models
+
+
+def ensure_columns(engine):
+    """Add columns declared on the models that existing tables are missing.
+
+    ``create_all`` never alters a table it didn't create. New columns must be
+    nullable, since SQLite can only add columns without a NOT NULL default.
+    """
+    inspector = inspect(engine)
+    for table in models.Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+
+
+def ensure_indexes(engine):
+    """Create any indexes declared on the models that the database is missing.
+
+    ``create_all`` only emits CREATE INDEX for tables it creates itself, so an
+    existing hanythrift.db never picks up indexes added to models.py later.
+    """
+    # IF NOT EXISTS rather than checkfirst: reflection can't see expression
+    # indexes such as ix_products_category_lower
+    with engine.begin() as conn:
+        for table in models.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text
+from sqlalchemy import func, Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -27,11 +27,11 @@ class Product(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(Text)
-    price = Column(Float)
+    price = Column(Float, index=True)
     image_url = Column(String)
     category = Column(String)
     stock = Column(Integer)
-    seller_id = Column(Integer, ForeignKey("users.id"))
+    seller_id = Column(Integer, ForeignKey("users.id"), index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -39,11 +39,14 @@ class Product(Base):
     order_items = relationship("OrderItem", back_populates="product")
     cart_items = relationship("CartItem", back_populates="product")
 
+# Category filters are case-insensitive (see catalog.query_products_sql)
+Index("ix_products_category_lower", func.lower(Product.category))
+
 class Order(Base):
     __tablename__ = "orders"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     total_amount = Column(Float)
     status = Column(String)  # pending, paid, shipped, delivered, cancelled
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -56,8 +59,8 @@ class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"))
-    product_id = Column(Integer, ForeignKey("products.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
     quantity = Column(Integer)
     price_at_time = Column(Float)
     
@@ -67,12 +70,33 @@ class OrderItem(Base):
 
 class CartItem(Base):
     __tablename__ = "cart_items"
+    __table_args__ = (
+        # Covers both "cart for user" and "is this product already in the cart"
+        Index("ix_cart_items_user_id_product_id", "user_id", "product_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    product_id = Column(Integer, ForeignKey("products.id"))
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
     quantity = Column(Integer)
     
     # Relationships
     user = relationship("User", back_populates="cart_items")
-    product = relationship("Product", back_populates="cart_items") 
\ No newline at end of file
+    product = relationship("Product", back_populates="cart_items") 
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "endpoint", "key", name="uq_idempotency_keys_user_endpoint_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    endpoint = Column(String)  # e.g. "POST /orders/"
+    request_hash = Column(String)
+    claim_token = Column(String)  # identifies the request that claimed the key
+    status_code = Column(Integer, nullable=True)  # NULL while the request is in flight
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True)
@@ -0,0 +1,255 @@
+"""On-demand cProfile profiling of API requests.
+
+A request is profiled when it carries X-Profile with a matching
+X-Profiler-Token, or when PROFILE_SAMPLE_RATE picks it. Results are kept in a
+ring buffer and served by the /admin/profiles endpoints.
+
+Importing this module globally patches ``run_in_threadpool`` in FastAPI's
+routing, dependency and concurrency modules, so work FastAPI hands to the
+threadpool is profiled too. The patch affects every route in the process, and
+import fails if another library has already replaced that function.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+import fastapi.concurrency
+import fastapi.dependencies.utils
+import fastapi.routing
+from fastapi import Header, HTTPException, Request, status
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool as _run_in_threadpool
+
+# Profiling is off unless a token is configured (X-Profile header) or sampling is enabled
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_RING_SIZE = 50
+PROFILE_TOP_N = 25
+PSTATS_SORT_KEYS = tuple(pstats.Stats.sort_arg_dict_default)
+# Deeper caller chains are cut off when building collapsed stacks
+MAX_STACK_DEPTH = 64
+
+
+class ProfileSession:
+    def __init__(self):
+        self.profiles = []
+
+
+_current_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+def _valid_token(token: Optional[str]) -> bool:
+    if PROFILER_TOKEN is None or token is None:
+        return False
+    # Constant-time comparison, so response timing doesn't leak the token
+    return secrets.compare_digest(token.encode(), PROFILER_TOKEN.encode())
+
+
+def _func_label(func) -> str:
+    filename, line, name = func
+    if filename == "~":  # built-in functions
+        return name.replace(";", ":")
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ":")
+
+
+class RequestProfiler:
+    """Runs selected requests under cProfile and keeps the results in a ring buffer.
+
+    One request is profiled at a time; others arriving meanwhile run normally.
+    """
+
+    def __init__(self, sample_rate: float = PROFILE_SAMPLE_RATE, ring_size: int = PROFILE_RING_SIZE):
+        self.sample_rate = sample_rate
+        self._entries = deque(maxlen=ring_size)
+        self._lock = threading.Lock()
+
+    def should_profile(self, request: Request) -> bool:
+        if "x-profile" in request.headers:
+            return _valid_token(request.headers.get("x-profiler-token"))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def profile(self, request: Request, handler):
+        if not self._lock.acquire(blocking=False):
+            return await handler(request)
+        session = ProfileSession()
+        token = _current_session.set(session)
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            # Covers body parsing, validation and JSON encoding on the event loop.
+            # Other coroutines running during awaits show up here too.
+            profile.enable()
+            try:
+                return await handler(request)
+            finally:
+                profile.disable()
+                session.profiles.insert(0, profile)
+                self._record(request, session, time.perf_counter() - start)
+        finally:
+            _current_session.reset(token)
+            self._lock.release()
+
+    def _record(self, request: Request, session: ProfileSession, duration: float):
+        stats = pstats.Stats(session.profiles[0])
+        for profile in session.profiles[1:]:
+            stats.add(profile)
+        self._entries.append({
+            "method": request.method,
+            "path": request.url.path,
+            "started_at": datetime.utcnow().isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "top": self._top(stats),
+            "stats": stats,
+        })
+
+    @staticmethod
+    def _top(stats: pstats.Stats, limit: int = PROFILE_TOP_N):
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return [
+            {
+                "function": _func_label(func),
+                "calls": nc,
+                "tottime_ms": round(tt * 1000, 3),
+                "cumtime_ms": round(ct * 1000, 3),
+            }
+            for func, (cc, nc, tt, ct, callers) in rows
+        ]
+
+    def aggregate(self) -> Optional[pstats.Stats]:
+        entries = list(self._entries)
+        if not entries:
+            return None
+        stats = pstats.Stats()
+        for entry in entries:
+            stats.add(entry["stats"])
+        return stats
+
+    def summary(self):
+        entries = list(self._entries)
+        aggregate = self.aggregate()
+        return {
+            "sample_rate": self.sample_rate,
+            "requests": [{key: value for key, value in entry.items() if key != "stats"} for entry in entries],
+            "top": self._top(aggregate) if aggregate else [],
+        }
+
+    def pstats_text(self, sort: str = "tottime") -> str:
+        aggregate = self.aggregate()
+        if aggregate is None:
+            return "No profiled requests yet.\n"
+        stream = io.StringIO()
+        aggregate.stream = stream
+        aggregate.sort_stats(sort).print_stats(PROFILE_TOP_N)
+        return stream.getvalue()
+
+    def collapsed_stacks(self) -> str:
+        """Flamegraph-compatible collapsed stacks ("a;b;c <microseconds>").
+
+        cProfile only records caller/callee pairs, so each function's self time
+        is attributed to the chain formed by following its heaviest caller.
+        """
+        aggregate = self.aggregate()
+        if aggregate is None:
+            return ""
+        stacks = {}
+        for func, (cc, nc, tt, ct, callers) in aggregate.stats.items():
+            weight = int(tt * 1_000_000)
+            if weight <= 0:
+                continue
+            chain = [func]
+            seen = {func}
+            current = callers
+            while current and len(chain) < MAX_STACK_DEPTH:
+                caller = max(current, key=lambda c: current[c][3])
+                if caller in seen:
+                    break
+                chain.append(caller)
+                seen.add(caller)
+                current = aggregate.stats.get(caller, (0, 0, 0, 0, {}))[4]
+            key = ";".join(_func_label(f) for f in reversed(chain))
+            stacks[key] = stacks.get(key, 0) + weight
+        return "".join(f"{stack} {weight}\n" for stack, weight in sorted(stacks.items()))
+
+
+request_profiler = RequestProfiler()
+
+
+@contextmanager
+def _profile_thread(session: ProfileSession):
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Python 3.12+ profiles all threads at once, so the request-level
+        # profiler already sees this thread
+        yield
+        return
+    try:
+        yield
+    finally:
+        profile.disable()
+        session.profiles.append(profile)
+
+
+async def _profiled_run_in_threadpool(func, *args, **kwargs):
+    """Drop-in for starlette's run_in_threadpool that profiles the worker thread.
+
+    FastAPI runs sync endpoints, sync dependencies (get_db) and response
+    validation for sync routes in separate threadpool calls; each one is
+    profiled while the request has a ProfileSession.
+    """
+    session = _current_session.get()
+    if session is None:
+        return await _run_in_threadpool(func, *args, **kwargs)
+
+    def profiled(*args, **kwargs):
+        with _profile_thread(session):
+            return func(*args, **kwargs)
+
+    return await _run_in_threadpool(profiled, *args, **kwargs)
+
+
+def _patch_run_in_threadpool(modules):
+    # Refuse to wrap anything but starlette's own function, so another patch
+    # (or a FastAPI upgrade that changes these imports) fails loudly here
+    for module in modules:
+        if getattr(module, "run_in_threadpool", None) is not _run_in_threadpool:
+            raise RuntimeError(
+                f"{module.__name__}.run_in_threadpool is not starlette.concurrency.run_in_threadpool; "
+                "refusing to patch it for request profiling"
+            )
+    for module in modules:
+        module.run_in_threadpool = _profiled_run_in_threadpool
+
+
+# Modules that imported run_in_threadpool by name; patch each reference
+_patch_run_in_threadpool((fastapi.routing, fastapi.dependencies.utils, fastapi.concurrency))
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that can run a request under the request profiler."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request: Request):
+            if not request_profiler.should_profile(request):
+                return await handler(request)
+            return await request_profiler.profile(request, handler)
+
+        return profiled_handler
+
+
+def require_profiler_token(x_profiler_token: Optional[str] = Header(None)):
+    if not _valid_token(x_profiler_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
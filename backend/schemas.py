@@ -39,6 +39,13 @@ class Product(ProductBase):
     class Config:
         from_attributes = True
 
+class ProductSuggestion(BaseModel):
+    id: int
+    name: str
+    category: str
+    price: float
+    stock: int
+
 # Order schemas
 class OrderItemBase(BaseModel):
     product_id: int
@@ -0,0 +1,156 @@
+import logging
+import threading
+from typing import Dict, List
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on trie nodes so memory stays predictable
+MAX_INDEX_NODES = 200000
+# Best-ranked products kept on every node; also the most a lookup can return
+TOP_K = 20
+
+
+class _TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.top: List[int] = []
+
+
+class ProductPrefixIndex:
+    """Trie over product names and categories with a ranked top-k per node.
+
+    Every product contributes a few lowercase terms (full name, each word of the
+    name and its category). Each node keeps the TOP_K best-ranked products under
+    it, so a lookup is a walk down the prefix and never depends on how many
+    products match. Products rank by units ordered, then stock, then name.
+    Order counts only grow, so record_order can move a product up in place;
+    stock is fixed when the product is added.
+    """
+
+    def __init__(self, max_nodes: int = MAX_INDEX_NODES):
+        self.max_nodes = max_nodes
+        self._root = _TrieNode()
+        self._node_count = 1
+        self._products: Dict[int, dict] = {}
+        self._ordered: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _terms(name: str, category: str) -> set:
+        name = (name or "").lower().strip()
+        terms = {name, (category or "").lower().strip()}
+        terms.update(name.split())
+        terms.discard("")
+        return terms
+
+    def _rank(self, product_id: int):
+        product = self._products[product_id]
+        return (-self._ordered.get(product_id, 0), -product["stock"], product["name"], product_id)
+
+    def _missing_nodes(self, terms: set) -> int:
+        missing = set()
+        for term in terms:
+            node = self._root
+            for depth, char in enumerate(term):
+                node = node.children.get(char)
+                if node is None:
+                    missing.update(term[:i + 1] for i in range(depth, len(term)))
+                    break
+        return len(missing)
+
+    def _place(self, product_id: int, terms: set):
+        """Put the product into the top list of every node on its terms' paths."""
+        rank = self._rank(product_id)
+        for term in terms:
+            node = self._root
+            for char in term:
+                node = node.children.setdefault(char, _TrieNode())
+                if product_id in node.top:
+                    node.top.sort(key=self._rank)
+                elif len(node.top) < TOP_K:
+                    node.top.append(product_id)
+                    node.top.sort(key=self._rank)
+                elif rank < self._rank(node.top[-1]):
+                    node.top[-1] = product_id
+                    node.top.sort(key=self._rank)
+
+    def _add(self, product: models.Product, ordered: int = 0) -> bool:
+        """Index the product; False if it doesn't fit under max_nodes."""
+        if product.id in self._products:
+            return True
+        terms = self._terms(product.name, product.category)
+        new_nodes = self._missing_nodes(terms)
+        if self._node_count + new_nodes > self.max_nodes:
+            return False
+        self._node_count += new_nodes
+        self._products[product.id] = {
+            "id": product.id,
+            "name": product.name,
+            "category": product.category,
+            "price": product.price,
+            "stock": product.stock or 0,
+        }
+        if ordered:
+            self._ordered[product.id] = ordered
+        self._place(product.id, terms)
+        return True
+
+    def build(self, db: Session):
+        products = db.query(models.Product).all()
+        ordered = dict(
+            db.query(models.OrderItem.product_id, func.sum(models.OrderItem.quantity))
+            .group_by(models.OrderItem.product_id)
+            .all()
+        )
+        with self._lock:
+            self._root = _TrieNode()
+            self._node_count = 1
+            self._products = {}
+            self._ordered = {}
+            dropped = sum(not self._add(product, ordered.get(product.id) or 0) for product in products)
+        if dropped:
+            logger.warning(
+                "Product search index reached %d nodes; %d of %d products are not searchable",
+                self.max_nodes, dropped, len(products),
+            )
+
+    def add_product(self, product: models.Product):
+        with self._lock:
+            added = self._add(product)
+        if not added:
+            logger.warning(
+                "Product search index reached %d nodes; product %s is not searchable",
+                self.max_nodes, product.id,
+            )
+
+    def record_order(self, quantities: Dict[int, int]):
+        """Count newly ordered units (product id -> quantity) towards ranking."""
+        with self._lock:
+            for product_id, quantity in quantities.items():
+                product = self._products.get(product_id)
+                if product is None or quantity <= 0:
+                    continue
+                self._ordered[product_id] = self._ordered.get(product_id, 0) + quantity
+                self._place(product_id, self._terms(product["name"], product["category"]))
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        prefix = prefix.lower().strip()
+        if not prefix:
+            return []
+        with self._lock:
+            node = self._root
+            for char in prefix:
+                node = node.children.get(char)
+                if node is None:
+                    return []
+            return [self._products[product_id] for product_id in node.top[:limit]]
+
+
+product_index = ProductPrefixIndex()
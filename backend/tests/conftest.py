@@ -0,0 +1,39 @@
+import os
+import sys
+import tempfile
+
+# Point the app at a throwaway database before anything imports main/database,
+# so running the tests never touches hanythrift.db
+# (always assigned: app startup deletes every product in whatever database this names)
+os.environ["HANYTHRIFT_DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from migrations import ensure_indexes
+from seeding import seed
+
+
+@pytest.fixture
+def memory_engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    models.Base.metadata.create_all(bind=engine)
+    ensure_indexes(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def seeded_sessions(memory_engine):
+    """Session factory over an in-memory database filled by seeding.seed()."""
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=memory_engine)
+    db = Session()
+    seed(db)
+    db.close()
+    return Session
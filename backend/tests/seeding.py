@@ -0,0 +1,40 @@
+"""Synthetic catalog/cart/order data shared by the tests. Importing it has no side effects."""
+import models
+
+SEED_USERS = 200
+SEED_PRODUCTS = 2000
+SEED_ORDERS = 1000
+# Every tenth user is a seller; this one also has cart items and orders
+SELLER_EMAIL = "user10@example.com"
+
+
+def seed(db):
+    db.add_all(
+        models.User(email=f"user{i}@example.com", name=f"User {i}", hashed_password="x", is_seller=i % 10 == 0)
+        for i in range(1, SEED_USERS + 1)
+    )
+    db.add_all(
+        models.Product(
+            name=f"Product {i}",
+            description="Seeded product",
+            price=100.0 + i,
+            image_url="",
+            category=f"Category {i % 12}",
+            stock=i % 7,
+            seller_id=(i % 20) * 10 + 10,
+        )
+        for i in range(1, SEED_PRODUCTS + 1)
+    )
+    db.add_all(
+        models.CartItem(user_id=i % SEED_USERS + 1, product_id=i % SEED_PRODUCTS + 1, quantity=1)
+        for i in range(SEED_PRODUCTS)
+    )
+    db.add_all(
+        models.Order(user_id=i % SEED_USERS + 1, total_amount=500.0, status="pending")
+        for i in range(SEED_ORDERS)
+    )
+    db.add_all(
+        models.OrderItem(order_id=i % SEED_ORDERS + 1, product_id=i % SEED_PRODUCTS + 1, quantity=1, price_at_time=100.0)
+        for i in range(SEED_ORDERS * 3)
+    )
+    db.commit()
@@ -0,0 +1,89 @@
+import itertools
+import time
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import catalog as catalog_module
+import main
+import models
+from catalog import CatalogReadModel, SORT_OPTIONS, _timestamp, query_products_sql
+
+pytestmark = pytest.mark.skipif(catalog_module.np is None, reason="numpy is not installed")
+
+GRID = list(itertools.product(
+    # Category matching is case-insensitive on both paths
+    (None, "Category 0", "category 5", "CATEGORY 5", "Missing"),
+    (None, 10, 9999),
+    (None, 500.0),
+    (None, 1500.0),
+    (False, True),
+    (None,) + SORT_OPTIONS,
+))
+# (skip, limit) pairs, including the negative values SQLite treats as 0 / no limit
+PAGES = ((0, 100), (40, 25), (0, -1), (-3, 5), (5000, 10))
+
+
+@pytest.fixture
+def catalog(seeded_sessions):
+    db = seeded_sessions()
+    read_model = CatalogReadModel(enabled=True)
+    read_model.build(db)
+    yield db, read_model
+    db.close()
+
+
+def assert_matches_sql(db, read_model):
+    for (category, seller_id, min_price, max_price, in_stock, sort), (skip, limit) in itertools.product(GRID, PAGES):
+        filters = dict(
+            category=category, seller_id=seller_id, min_price=min_price,
+            max_price=max_price, in_stock=in_stock, sort=sort
+        )
+        expected = [product.id for product in query_products_sql(db, skip, limit, **filters)]
+        assert read_model.query(skip, limit, **filters) == expected, f"skip={skip} limit={limit} {filters}"
+
+
+def test_read_model_matches_sql(catalog):
+    assert_matches_sql(*catalog)
+
+
+def test_read_model_matches_sql_after_incremental_writes(catalog):
+    db, read_model = catalog
+    for i in range(50):
+        product = models.Product(
+            name=f"Late Product {i}", description="", price=100.0 + i * 37,
+            image_url="", category="Category 5", stock=i % 3, seller_id=10
+        )
+        db.add(product)
+        db.commit()
+        db.refresh(product)
+        read_model.upsert(product)
+
+    assert_matches_sql(db, read_model)
+
+
+def test_enabling_read_model_without_numpy_fails(monkeypatch):
+    monkeypatch.setattr(catalog_module, "np", None)
+
+    with pytest.raises(RuntimeError):
+        CatalogReadModel(enabled=True)
+
+
+def test_timestamps_are_utc_regardless_of_local_timezone(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        assert _timestamp(datetime(2024, 3, 10, 2, 30, 0, 5)) == 1710037800_000_005
+        assert _timestamp(datetime(2024, 1, 1)) == 1704067200_000_000
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+@pytest.mark.parametrize("params", ["limit=-1", "skip=-3&limit=5"])
+def test_read_products_rejects_negative_paging(params):
+    response = TestClient(main.app).get(f"/products/?{params}")
+
+    assert response.status_code == 422
+
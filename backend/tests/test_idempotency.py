@@ -0,0 +1,187 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import auth
+import main
+import models
+import schemas
+from database import SessionLocal
+from idempotency import IDEMPOTENCY_KEY_MAX_LENGTH, run_idempotent
+
+ENDPOINT = "POST /orders/"
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    # A file database so concurrent requests get separate connections
+    engine = create_engine(f"sqlite:///{tmp_path / 'idempotency.db'}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add(models.User(id=1, email="buyer@example.com", name="Buyer", hashed_password="x"))
+    db.add_all(
+        models.Product(id=i, name=f"Product {i}", description="", price=100.0 * i, image_url="",
+                       category="Clothing", stock=5, seller_id=1)
+        for i in (1, 2)
+    )
+    db.commit()
+    db.close()
+    yield Session
+    engine.dispose()
+
+
+def order(*product_ids):
+    return schemas.OrderCreate(
+        total_amount=300.0, status="pending",
+        items=[schemas.OrderItemCreate(product_id=product_id, quantity=1) for product_id in product_ids],
+    )
+
+
+def place_order(Session, payload, key="key-1", delay=0.0, calls=None):
+    db = Session()
+    try:
+        user = db.get(models.User, 1)
+
+        def handler():
+            if calls is not None:
+                calls.append(key)
+            time.sleep(delay)
+            return main._create_order(payload, db, user)
+
+        return run_idempotent(db, key, user.id, ENDPOINT, payload, schemas.Order, handler)
+    finally:
+        db.close()
+
+
+def order_count(Session):
+    db = Session()
+    try:
+        return db.query(models.Order).count()
+    finally:
+        db.close()
+
+
+def test_replay_returns_stored_response_without_rerunning(sessions):
+    calls = []
+    first = place_order(sessions, order(1, 2), calls=calls)
+    second = place_order(sessions, order(1, 2), calls=calls)
+
+    assert second == first
+    assert len(calls) == 1
+    assert order_count(sessions) == 1
+
+
+def test_same_key_with_different_body_is_rejected(sessions):
+    place_order(sessions, order(1, 2))
+    with pytest.raises(HTTPException) as exc_info:
+        place_order(sessions, order(1))
+
+    assert exc_info.value.status_code == 422
+    assert order_count(sessions) == 1
+
+
+def test_duplicate_of_in_flight_request_gets_409_without_waiting(sessions):
+    calls, results = [], []
+    first = threading.Thread(target=lambda: results.append(place_order(sessions, order(1, 2), delay=1.0, calls=calls)))
+    first.start()
+    time.sleep(0.2)
+
+    start = time.monotonic()
+    with pytest.raises(HTTPException) as exc_info:
+        place_order(sessions, order(1, 2), calls=calls)
+    elapsed = time.monotonic() - start
+    first.join()
+
+    assert exc_info.value.status_code == 409
+    assert elapsed < 0.5
+    # Once the first request finishes, a retry replays its response
+    assert place_order(sessions, order(1, 2), calls=calls) == results[0]
+    assert len(calls) == 1
+    assert order_count(sessions) == 1
+
+
+def test_failure_before_any_write_releases_the_key(sessions):
+    with pytest.raises(HTTPException) as exc_info:
+        place_order(sessions, order(1, 99))
+    assert exc_info.value.status_code == 404
+    assert order_count(sessions) == 0
+
+    db = sessions()
+    assert db.query(models.IdempotencyKey).count() == 0
+    db.close()
+
+
+def test_failure_after_commit_keeps_the_key(sessions):
+    calls = []
+    payload = order(1, 2)
+
+    def failing_handler(db, user):
+        calls.append(1)
+        main._create_order(payload, db, user)
+        raise RuntimeError("failed after the order was written")
+
+    db = sessions()
+    user = db.get(models.User, 1)
+    with pytest.raises(RuntimeError):
+        run_idempotent(db, "key-1", user.id, ENDPOINT, payload, schemas.Order, lambda: failing_handler(db, user))
+    with pytest.raises(HTTPException) as exc_info:
+        run_idempotent(db, "key-1", user.id, ENDPOINT, payload, schemas.Order, lambda: failing_handler(db, user))
+    db.close()
+
+    assert exc_info.value.status_code == 500
+    assert len(calls) == 1
+    assert order_count(sessions) == 1
+
+
+def route_buyer(db):
+    user = db.query(models.User).filter(models.User.email == "route-buyer@example.com").first()
+    if user is None:
+        user = models.User(email="route-buyer@example.com", name="Buyer", hashed_password="x")
+        db.add(user)
+        db.commit()
+    return user
+
+
+def route_headers(key):
+    return {
+        "Authorization": f"Bearer {auth.create_access_token({'sub': 'route-buyer@example.com'})}",
+        "Idempotency-Key": key,
+    }
+
+
+def test_post_orders_replays_with_idempotency_key_header():
+    db = SessionLocal()
+    user = route_buyer(db)
+    product_id = db.query(models.Product.id).first()[0]
+    orders_before = db.query(models.Order).filter(models.Order.user_id == user.id).count()
+    db.close()
+
+    client = TestClient(main.app)
+    headers = route_headers("route-key")
+    body = {"total_amount": 650.0, "status": "pending", "items": [{"product_id": product_id, "quantity": 1}]}
+    first = client.post("/orders/", json=body, headers=headers)
+    second = client.post("/orders/", json=body, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    db = SessionLocal()
+    assert db.query(models.Order).filter(models.Order.user_id == user.id).count() == orders_before + 1
+    db.close()
+
+
+def test_overlong_idempotency_key_is_rejected():
+    db = SessionLocal()
+    route_buyer(db)
+    product_id = db.query(models.Product.id).first()[0]
+    db.close()
+
+    headers = route_headers("k" * (IDEMPOTENCY_KEY_MAX_LENGTH + 1))
+    response = TestClient(main.app).post("/cart/", json={"product_id": product_id, "quantity": 1}, headers=headers)
+
+    assert response.status_code == 422
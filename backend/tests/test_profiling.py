@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import fastapi.concurrency
+import fastapi.dependencies.utils
+import fastapi.routing
+import pytest
+from fastapi.testclient import TestClient
+
+import auth
+import main
+import models
+import profiling
+from database import SessionLocal
+
+TOKEN = "test-profiler-token"
+EMAIL = "profiled-buyer@example.com"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILER_TOKEN", TOKEN)
+    # A fresh ring buffer, seen by both the routes and the admin endpoints
+    request_profiler = profiling.RequestProfiler(sample_rate=0)
+    monkeypatch.setattr(profiling, "request_profiler", request_profiler)
+    monkeypatch.setattr(main, "request_profiler", request_profiler)
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def auth_headers():
+    db = SessionLocal()
+    user = db.query(models.User).filter(models.User.email == EMAIL).first()
+    if user is None:
+        user = models.User(email=EMAIL, name="Buyer", hashed_password="x")
+        db.add(user)
+        db.commit()
+    product_id = db.query(models.Product.id).first()[0]
+    db.add(models.Order(user_id=user.id, total_amount=100.0, status="pending"))
+    db.flush()
+    order = db.query(models.Order).filter(models.Order.user_id == user.id).first()
+    db.add(models.OrderItem(order_id=order.id, product_id=product_id, quantity=1, price_at_time=100.0))
+    db.commit()
+    db.close()
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': EMAIL})}"}
+
+
+def profiled_pstats(client, auth_headers, path):
+    response = client.get(path, headers={**auth_headers, "X-Profile": "1", "X-Profiler-Token": TOKEN})
+    assert response.status_code == 200
+    pstats_response = client.get("/admin/profiles/pstats?sort=cumulative", headers={"X-Profiler-Token": TOKEN})
+    assert pstats_response.status_code == 200
+    return profiling.request_profiler.aggregate()
+
+
+def test_sync_route_profile_covers_threadpool_work(client, auth_headers):
+    stats = profiled_pstats(client, auth_headers, "/orders/")
+    functions = {name for (filename, line, name) in stats.stats}
+
+    assert "read_orders" in functions
+    # Response validation, the lazy Order.items loads and the get_db dependency
+    # each run in their own threadpool call
+    assert "validate_python" in functions
+    assert "_emit_lazyload" in functions
+    assert "get_db" in functions
+
+
+def test_requests_are_not_profiled_without_a_valid_token(client, auth_headers):
+    client.get("/orders/", headers={**auth_headers, "X-Profile": "1", "X-Profiler-Token": "wrong"})
+    client.get("/orders/", headers=auth_headers)
+
+    assert profiling.request_profiler.aggregate() is None
+    assert client.get("/admin/profiles").status_code == 403
+
+
+def test_admin_endpoints_expose_summary_and_collapsed_stacks(client, auth_headers):
+    profiled_pstats(client, auth_headers, "/orders/")
+    headers = {"X-Profiler-Token": TOKEN}
+
+    summary = client.get("/admin/profiles", headers=headers).json()
+    assert [entry["path"] for entry in summary["requests"]] == ["/orders/"]
+    assert summary["top"]
+
+    collapsed = client.get("/admin/profiles/collapsed", headers=headers).text
+    lines = collapsed.splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert client.get("/admin/profiles/pstats?sort=bogus", headers=headers).status_code == 400
+
+
+def test_threadpool_patch_covers_fastapi_and_refuses_foreign_functions():
+    for module in (fastapi.routing, fastapi.dependencies.utils, fastapi.concurrency):
+        assert module.run_in_threadpool is profiling._profiled_run_in_threadpool
+
+    patched_elsewhere = SimpleNamespace(__name__="other", run_in_threadpool=lambda func, *args: func(*args))
+    with pytest.raises(RuntimeError):
+        profiling._patch_run_in_threadpool([patched_elsewhere])
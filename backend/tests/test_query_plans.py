@@ -0,0 +1,209 @@
+"""Query-plan regression tests for the API routes.
+
+Each case runs a route against the seeded in-memory database, captures the
+SQL it issues (including lazy loads triggered by response validation) and
+runs EXPLAIN QUERY PLAN on every statement. A query that falls back to a full
+table SCAN fails the test unless the case explicitly allows it.
+"""
+import asyncio
+import re
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+import auth
+import catalog
+import main
+import models
+import schemas
+from catalog import CatalogReadModel, query_products_sql
+from seeding import SEED_PRODUCTS, SELLER_EMAIL
+
+SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+
+@contextmanager
+def capture_sql(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def explain(engine, statement, parameters):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    return [row[3] for row in rows]
+
+
+def full_scans(plan):
+    tables = []
+    for detail in plan:
+        match = SCAN_RE.match(detail)
+        if match and match.group(1) != "CONSTANT":
+            tables.append(match.group(1))
+    return tables
+
+
+def validate(model, result):
+    """Validate a route result the way FastAPI's response_model would."""
+    if isinstance(result, list):
+        return [model.model_validate(item) for item in result]
+    return model.model_validate(result)
+
+
+def first_cart_item_id(db, user):
+    return db.query(models.CartItem.id).filter(models.CartItem.user_id == user.id).first()[0]
+
+
+def login(db, user):
+    # Seeded users have no usable password hash
+    user.hashed_password = auth.get_password_hash("secret")
+    db.commit()
+    form = SimpleNamespace(username=user.email, password="secret")
+    return validate(schemas.Token, asyncio.run(main.login_for_access_token(form, db)))
+
+
+def refresh(db, user):
+    refresh_data = schemas.RefreshToken(refresh_token=auth.create_refresh_token({"sub": user.email}))
+    return validate(schemas.Token, asyncio.run(main.refresh_token(refresh_data, db)))
+
+
+NEW_PRODUCT = schemas.ProductCreate(
+    name="Check Product", description="", price=1.0, image_url="", category="Category 1", stock=1
+)
+NEW_ORDER = schemas.OrderCreate(
+    total_amount=200.0, status="pending",
+    items=[schemas.OrderItemCreate(product_id=1, quantity=1), schemas.OrderItemCreate(product_id=2, quantity=1)],
+)
+
+# name -> (callable(db, user), tables the case may scan in full)
+ROUTE_CASES = {
+    "login_for_access_token": (login, set()),
+    "refresh_token": (refresh, set()),
+    # The lookup behind every authenticated route
+    "get_current_user": (lambda db, user: asyncio.run(
+        auth.get_current_user(auth.create_access_token({"sub": user.email}), db)), set()),
+    "create_user": (lambda db, user: validate(
+        schemas.User, main.create_user(schemas.UserCreate(email="new@example.com", name="New", password="secret"), db)), set()),
+    # Served from the catalog read model built from the same data (see seeded_catalog);
+    # the SQL fallback is covered by LISTING_CASES
+    "read_products": (lambda db, user: validate(schemas.Product, main.read_products(0, 100, db)), set()),
+    "read_product": (lambda db, user: validate(schemas.Product, main.read_product(SEED_PRODUCTS // 2, db)), set()),
+    "create_product": (lambda db, user: validate(schemas.Product, main.create_product(NEW_PRODUCT, db, user)), set()),
+    "read_cart": (lambda db, user: validate(schemas.CartItem, main.read_cart(db, user)), set()),
+    "add_to_cart": (lambda db, user: validate(
+        schemas.CartItem, main.add_to_cart(schemas.CartItemCreate(product_id=3, quantity=1), db, user, idempotency_key=None)), set()),
+    "update_cart_item": (lambda db, user: validate(
+        schemas.CartItem, main.update_cart_item(first_cart_item_id(db, user), schemas.CartItemUpdate(quantity=2), db, user)), set()),
+    "remove_from_cart": (lambda db, user: main.remove_from_cart(first_cart_item_id(db, user), db, user), set()),
+    "read_orders": (lambda db, user: validate(schemas.Order, main.read_orders(db, user)), set()),
+    "create_order": (lambda db, user: validate(
+        schemas.Order, main.create_order(NEW_ORDER, db, user, idempotency_key=None)), set()),
+    "create_order_idempotent": (lambda db, user: [
+        validate(schemas.Order, main.create_order(NEW_ORDER, db, user, idempotency_key="plan-key"))
+        for _ in range(2)
+    ], set()),
+}
+
+# Routes that never touch the database
+NO_SQL_ROUTES = {
+    "health_check",
+    "suggest_products",  # served from the in-memory prefix index
+    "read_profiles",
+    "read_profiles_pstats",
+    "read_profiles_collapsed",
+}
+
+
+# Filtered/sorted listings served by SQL when numpy isn't installed.
+# name -> (filters, tables the case may scan in full)
+LISTING_CASES = {
+    # Listings without a selective filter read the whole catalog by design
+    # (price sort walks ix_products_price and stops at the limit); in_stock
+    # alone matches most products, so a scan is the right plan there
+    "unfiltered": ({}, {"products"}),
+    "sort_newest": ({"sort": "newest"}, {"products"}),
+    "sort_price": ({"sort": "price_asc"}, {"products"}),
+    "in_stock": ({"in_stock": True}, {"products"}),
+    "category": ({"category": "Category 3"}, set()),
+    "category_other_case": ({"category": "category 3"}, set()),
+    "seller": ({"seller_id": 10}, set()),
+    "category_price_desc": ({"category": "Category 3", "sort": "price_desc"}, set()),
+    "seller_newest": ({"seller_id": 10, "sort": "newest"}, set()),
+    "price_range": ({"min_price": 500.0, "max_price": 900.0}, set()),
+    "category_in_stock_min_price": ({"category": "Category 3", "in_stock": True, "min_price": 300.0}, set()),
+    "max_price_newest": ({"max_price": 300.0, "sort": "newest"}, set()),
+}
+
+
+def assert_no_unexpected_scans(name, engine, statements, allowed):
+    assert statements, f"{name} issued no queries"
+    scans = [
+        (table, " ".join(statement.split()))
+        for statement, parameters in statements
+        for table in full_scans(explain(engine, statement, parameters))
+        if table not in allowed
+    ]
+    assert not scans, f"{name} falls back to full table scans: {scans}"
+
+
+@pytest.fixture
+def seeded_catalog(seeded_sessions, monkeypatch):
+    # read_products answers from the read model when it's enabled; build one from the test data
+    read_model = CatalogReadModel(enabled=catalog.np is not None)
+    db = seeded_sessions()
+    read_model.build(db)
+    db.close()
+    monkeypatch.setattr(main, "catalog_model", read_model)
+
+
+@pytest.mark.parametrize("name", ROUTE_CASES)
+def test_route_has_no_unexpected_full_scans(name, memory_engine, seeded_sessions, seeded_catalog):
+    call, allowed = ROUTE_CASES[name]
+    db = seeded_sessions()
+    try:
+        user = db.query(models.User).filter(models.User.email == SELLER_EMAIL).first()
+        with capture_sql(memory_engine) as statements:
+            call(db, user)
+    finally:
+        db.close()
+
+    assert_no_unexpected_scans(name, memory_engine, statements, allowed)
+
+
+@pytest.mark.parametrize("name", LISTING_CASES)
+def test_product_listing_sql_has_no_unexpected_full_scans(name, memory_engine, seeded_sessions):
+    filters, allowed = LISTING_CASES[name]
+    db = seeded_sessions()
+    try:
+        with capture_sql(memory_engine) as statements:
+            query_products_sql(db, 0, 100, **filters)
+    finally:
+        db.close()
+
+    assert_no_unexpected_scans(name, memory_engine, statements, allowed)
+
+
+def test_suggest_products_issues_no_sql():
+    with capture_sql(main.engine) as statements:
+        main.suggest_products(prefix="pro", limit=10)
+
+    assert statements == []
+
+
+def test_every_route_is_checked():
+    endpoints = {route.endpoint.__name__ for route in main.app.routes if isinstance(route, APIRoute)}
+
+    unchecked = endpoints - set(ROUTE_CASES) - NO_SQL_ROUTES
+    assert not unchecked, f"routes without a query-plan case: {sorted(unchecked)}"
@@ -0,0 +1,101 @@
+import logging
+from types import SimpleNamespace
+
+from sqlalchemy import func
+
+import models
+from search_index import ProductPrefixIndex, TOP_K
+
+
+def product(id, name, category="Clothing", stock=1):
+    return SimpleNamespace(id=id, name=name, category=category, price=100.0, stock=stock)
+
+
+def names(results):
+    return [result["name"] for result in results]
+
+
+def test_build_indexes_every_product(seeded_sessions):
+    index = ProductPrefixIndex()
+    db = seeded_sessions()
+    index.build(db)
+    db.close()
+
+    assert len(index.suggest("product 1234")) == 1
+    assert len(index.suggest("category 5", limit=TOP_K)) == TOP_K
+
+
+def test_build_ranks_by_units_ordered_then_stock(seeded_sessions):
+    db = seeded_sessions()
+    index = ProductPrefixIndex()
+    index.build(db)
+    ordered = dict(
+        db.query(models.OrderItem.product_id, func.sum(models.OrderItem.quantity))
+        .group_by(models.OrderItem.product_id)
+        .all()
+    )
+    expected = sorted(
+        db.query(models.Product).all(),
+        key=lambda p: (-(ordered.get(p.id) or 0), -(p.stock or 0), p.name, p.id),
+    )[:TOP_K]
+    db.close()
+
+    assert [result["id"] for result in index.suggest("product", limit=TOP_K)] == [p.id for p in expected]
+
+
+def test_record_order_moves_product_up():
+    index = ProductPrefixIndex()
+    for i in range(TOP_K + 10):
+        index.add_product(product(i + 1, f"Hat {i:02d}", "Headwear", stock=5 if i == 0 else 1))
+    last = TOP_K + 10
+    assert last not in [result["id"] for result in index.suggest("hat", limit=TOP_K)]
+
+    # Ordered units outrank stock, and a product can re-enter a full top list
+    index.record_order({last: 2})
+    index.record_order({last: 1, 999: 4})
+
+    assert names(index.suggest("hat", limit=2)) == [f"Hat {last - 1:02d}", "Hat 00"]
+
+
+def test_prefix_matches_name_words_and_category():
+    index = ProductPrefixIndex()
+    index.add_product(product(1, "Vintage Band T-Shirt", "Clothing"))
+    index.add_product(product(2, "Vans Old Skool", "Footwear"))
+
+    assert names(index.suggest("v")) == ["Vans Old Skool", "Vintage Band T-Shirt"]
+    assert names(index.suggest("BAND")) == ["Vintage Band T-Shirt"]
+    assert names(index.suggest("foot")) == ["Vans Old Skool"]
+    assert index.suggest("x") == []
+    assert index.suggest("  ") == []
+
+
+def test_add_product_is_visible_immediately():
+    index = ProductPrefixIndex()
+    index.add_product(product(1, "Wool Beanie", "Headwear", stock=2))
+    index.add_product(product(2, "Wool Peacoat", "Outerwear", stock=5))
+
+    assert names(index.suggest("wool")) == ["Wool Peacoat", "Wool Beanie"]
+
+
+def test_ranking_is_not_limited_by_alphabetical_order():
+    index = ProductPrefixIndex()
+    for i in range(2000):
+        index.add_product(product(i + 1, f"Pants {i:04d}", "Bottoms", stock=100 if i == 1999 else 1))
+
+    results = index.suggest("pants", limit=5)
+    assert results[0]["name"] == "Pants 1999"
+    assert names(results[1:]) == ["Pants 0000", "Pants 0001", "Pants 0002", "Pants 0003"]
+
+
+def test_node_cap_bounds_the_index(caplog):
+    index = ProductPrefixIndex(max_nodes=40)
+    index.add_product(product(1, "Cap", "Headwear"))
+    node_count = index._node_count
+    # Would need more nodes than the cap allows, so it is skipped with a warning
+    with caplog.at_level(logging.WARNING, logger="search_index"):
+        index.add_product(product(2, "Extremely Long Product Name", "Accessories"))
+
+    assert "product 2 is not searchable" in caplog.text
+    assert index._node_count == node_count <= 40
+    assert index.suggest("extremely") == []
+    assert names(index.suggest("cap")) == ["Cap"]
@@ -38,16 +38,13 @@ export default function CategoryProducts({ slug }: { slug: string }) {
       try {
         setIsLoading(true)
         setError(null)
-        const allProducts = await api.getProducts()
+        // The API matches the category case-insensitively
+        const categoryProducts = await api.getProducts({ category: slug })
         
-        if (!allProducts) {
+        if (!categoryProducts) {
           throw new Error('Failed to fetch products')
         }
 
-        // Filter products by category
-        const categoryProducts = allProducts.filter(
-          (product: any) => product.category.toLowerCase() === slug.toLowerCase()
-        )
         setProducts(categoryProducts)
       } catch (error: any) {
         console.error('Failed to fetch products:', error)
@@ -7,6 +7,7 @@ import { useRouter, useSearchParams } from "next/navigation"
 import { Input } from "@/components/ui/input"
 import { Button } from "@/components/ui/button"
 import { Search, X } from "lucide-react"
+import { api, type ProductSuggestion } from "@/lib/api"
 
 export default function SearchBar() {
   const router = useRouter()
@@ -14,12 +15,39 @@ export default function SearchBar() {
   const initialQuery = searchParams.get("q") || ""
   const [query, setQuery] = useState(initialQuery)
   const [isFocused, setIsFocused] = useState(false)
+  const [suggestions, setSuggestions] = useState<ProductSuggestion[]>([])
 
   // Update query when URL search param changes
   useEffect(() => {
     setQuery(searchParams.get("q") || "")
   }, [searchParams])
 
+  // Fetch suggestions as the user types (debounced)
+  useEffect(() => {
+    const prefix = query.trim()
+    if (!prefix) {
+      setSuggestions([])
+      return
+    }
+
+    let cancelled = false
+    const timer = setTimeout(() => {
+      api
+        .suggestProducts(prefix)
+        .then((results) => {
+          if (!cancelled) setSuggestions(results)
+        })
+        .catch(() => {
+          if (!cancelled) setSuggestions([])
+        })
+    }, 120)
+
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
+  }, [query])
+
   const handleSearch = (e: React.FormEvent) => {
     e.preventDefault()
     if (query.trim()) {
@@ -58,7 +86,27 @@ export default function SearchBar() {
           </Button>
         )}
       </div>
+      {isFocused && suggestions.length > 0 && (
+        <ul className="absolute z-50 mt-1 w-full rounded-md border bg-background py-1 shadow-md">
+          {suggestions.map((suggestion) => (
+            <li key={suggestion.id}>
+              <button
+                type="button"
+                className="flex w-full items-center justify-between px-3 py-1.5 text-left text-sm hover:bg-muted"
+                // onMouseDown fires before the input's blur hides the list
+                onMouseDown={(e) => {
+                  e.preventDefault()
+                  setSuggestions([])
+                  router.push(`/products/${suggestion.id}`)
+                }}
+              >
+                <span>{suggestion.name}</span>
+                <span className="text-xs text-muted-foreground">{suggestion.category}</span>
+              </button>
+            </li>
+          ))}
+        </ul>
+      )}
     </form>
   )
 }
-
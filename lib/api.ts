@@ -19,6 +19,14 @@ export interface Product {
   seller_id: number;
 }
 
+export interface ProductSuggestion {
+  id: number;
+  name: string;
+  category: string;
+  price: number;
+  stock: number;
+}
+
 export interface CartItem {
   id: number;
   user_id: number;
@@ -162,8 +170,21 @@ class ApiClient {
   }
 
   // Products
-  async getProducts() {
-    return this.fetchWithAuth('/products/');
+  async getProducts(filters: {
+    category?: string;
+    min_price?: number;
+    max_price?: number;
+    in_stock?: boolean;
+    sort?: 'price_asc' | 'price_desc' | 'newest';
+    skip?: number;
+    limit?: number;
+  } = {}) {
+    const params = new URLSearchParams();
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value !== undefined) params.append(key, String(value));
+    });
+    const query = params.toString();
+    return this.fetchWithAuth(`/products/${query ? `?${query}` : ''}`);
   }
 
   async getProduct(id: number) {
@@ -184,6 +205,15 @@ class ApiClient {
     }
   }
 
+  async suggestProducts(prefix: string, limit: number = 8): Promise<ProductSuggestion[]> {
+    const params = new URLSearchParams({ prefix, limit: String(limit) });
+    const response = await fetch(`${API_BASE_URL}/products/suggest?${params}`);
+    if (!response.ok) {
+      throw new Error('Failed to fetch suggestions');
+    }
+    return response.json();
+  }
+
   async createProduct(product: Omit<Product, 'id' | 'seller_id'>) {
     return this.fetchWithAuth('/products/', {
       method: 'POST',
@@ -237,12 +267,15 @@ class ApiClient {
     return this.fetchWithAuth('/orders/');
   }
 
+  // Pass the same idempotencyKey when retrying so the server replays the
+  // original order instead of creating a duplicate
   async createOrder(order: {
     total_amount: number;
     items: { product_id: number; quantity: number }[];
-  }) {
+  }, idempotencyKey?: string) {
     return this.fetchWithAuth('/orders/', {
       method: 'POST',
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
       body: JSON.stringify(order),
     });
   }